@@ -2,8 +2,13 @@ import streamlit as st
 import pandas as pd
 import firebase_admin
 from firebase_admin import credentials, auth, firestore, exceptions
-from datetime import datetime, date
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 # Initialize Firebase Admin SDK
 if not firebase_admin._apps:
@@ -15,14 +20,37 @@ if not firebase_admin._apps:
         st.error(f"Firebase initialization failed: {str(e)}")
         st.stop()
 
-db = firestore.client()
+@st.cache_resource
+def get_db():
+    """Process-wide Firestore client, so its gRPC channel survives reruns."""
+    return firestore.client()
+
+db = get_db()
+FIRESTORE_BATCH_LIMIT = 500  # max writes per Firestore batch
+FEED_QUERY_LIMIT = 50  # most-upvoted reviews fetched for the feed
+FEED_LISTENER_TIMEOUT = 10  # seconds to wait for a listener's first snapshot
+FEED_LISTENER_RETRY = 60  # seconds before re-subscribing after a listener failure
+AUTH_REQUEST_TIMEOUT = 10  # seconds, Firebase Auth REST calls
+
+DASHBOARD_CSS = """
+<style>
+    [data-testid="stMetricValue"] { font-size: 18px; }
+    [data-testid="stMetricLabel"] { font-size: 16px; }
+    .stDataFrame { margin-bottom: 20px; }
+    [data-testid="stExpander"] div[role="button"] p { font-size: 1.2rem; font-weight: bold; }
+    .stButton>button { width: 100%; margin: 5px 0; transition: all 0.3s ease; }
+    .stButton>button:hover { transform: scale(1.05); box-shadow: 0 2px 5px rgba(0,0,0,0.2); }
+    .stContainer { border-radius: 10px; padding: 20px; margin: 10px 0; box-shadow: 0 2px 5px rgba(0,0,0,0.1); background: #f8f9fa; }
+</style>
+"""
 
 # ----------------------
 # Authentication Functions
 # ----------------------
+IBA_EMAIL_DOMAINS = ("@iba.edu.pk", "@khi.iba.edu.pk")
+
 def is_iba_user(email):
-    allowed_domains = ("@iba.edu.pk", "@khi.iba.edu.pk")
-    return any(email.endswith(domain) for domain in allowed_domains)
+    return email.endswith(IBA_EMAIL_DOMAINS)
 
 def handle_auth_error(e):
     error_messages = {
@@ -36,15 +64,23 @@ def handle_auth_error(e):
     else:
         return f"Authentication error: {str(e)}"
 
+@st.cache_resource
+def get_auth_session():
+    """Keep-alive HTTP session for the Firebase Auth REST API, shared across reruns."""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return session
+
 def sign_in_with_email_and_password(email, password):
     api_key = st.secrets["firebase"]["apiKey"]
     url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={api_key}"
     payload = {"email": email, "password": password, "returnSecureToken": True}
-    response = requests.post(url, json=payload)
+    response = get_auth_session().post(url, json=payload, timeout=AUTH_REQUEST_TIMEOUT)
     if response.status_code == 200:
-        return response.json()  # Contains "localId", "idToken", etc.
+        return orjson.loads(response.content)  # Contains "localId", "idToken", etc.
     else:
-        error = response.json().get("error", {}).get("message", "Unknown error")
+        error = orjson.loads(response.content).get("error", {}).get("message", "Unknown error")
         raise Exception(error)
 
 def send_password_reset_email(email):
@@ -52,11 +88,11 @@ def send_password_reset_email(email):
     api_key = st.secrets["firebase"]["apiKey"]
     url = f"https://identitytoolkit.googleapis.com/v1/accounts:sendOobCode?key={api_key}"
     payload = {"requestType": "PASSWORD_RESET", "email": email}
-    response = requests.post(url, json=payload)
+    response = get_auth_session().post(url, json=payload, timeout=AUTH_REQUEST_TIMEOUT)
     if response.status_code == 200:
         return True
     else:
-        error = response.json().get("error", {}).get("message", "Unknown error")
+        error = orjson.loads(response.content).get("error", {}).get("message", "Unknown error")
         raise Exception(error)
 
 # ----------------------
@@ -65,13 +101,20 @@ def send_password_reset_email(email):
 if 'firebase_user' not in st.session_state:
     st.session_state.update({
         'firebase_user': None,
-        'applications': pd.DataFrame(),
+        'applications_records': [],  # source of truth; see get_applications_df()
+        'applications_version': 0,
+        'applications_prev': pd.DataFrame(),  # last-saved snapshot for diffing
         'contributions': pd.DataFrame(),
         'bookmarks': [],
-        'reviews': [],
+        'upvoted_reviews': [],  # ids from users/{uid}/upvoted_reviews
+        'user_reviews': [],  # reviews submitted by the current user
+        'bookmarked_reviews': [],
         'show_form': False,
         'edit_review_index': None,
         'data_loaded': False,
+        'profile_completed': False,
+        'user_profile_data': {},
+        'reviews_version': 0,
         'page': "👤 User Profile",
         'dummy': False,
         'show_forgot': False  # flag for showing forgot password form
@@ -167,39 +210,187 @@ def complete_profile():
             try:
                 user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
                 user_ref.set(profile_data, merge=True)
+                st.session_state.user_profile_data = {**st.session_state.user_profile_data, **profile_data}
+                st.session_state.profile_completed = True
                 st.success("Profile saved!")
                 st.experimental_rerun()  # Refresh to show dashboard with profile info
             except Exception as e:
                 st.error(f"Failed to save profile: {str(e)}")
 
-# Check if profile exists and is complete
-user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
-user_doc = user_ref.get()
-profile_completed = False
-if user_doc.exists:
-    user_profile_data = user_doc.to_dict()
-    profile_completed = user_profile_data.get("profile_completed", False)
-else:
-    user_profile_data = {}
+# Check if profile exists and is complete; once it is, it stays complete for the session
+if not st.session_state.profile_completed:
+    user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
+    user_doc = user_ref.get()
+    st.session_state.user_profile_data = user_doc.to_dict() if user_doc.exists else {}
+    st.session_state.profile_completed = st.session_state.user_profile_data.get("profile_completed", False)
+user_profile_data = st.session_state.user_profile_data
 
-if not profile_completed:
+if not st.session_state.profile_completed:
     complete_profile()
     st.stop()
 
+# Emitted ahead of the page body so the style element keeps the same position
+# on every rerun, and is not skipped by the st.stop() calls further down
+st.markdown(DASHBOARD_CSS, unsafe_allow_html=True)
+
 # ----------------------
 # Data Management Functions
 # ----------------------
+# Fields needed to render the profile's review lists
+REVIEW_LIST_FIELDS = ("Company", "Industry", "Department", "Semester", "Ease of Process",
+                      "Stipend Range", "Ease of Hiring", "Red Flags", "Offer Outcome",
+                      "stipend_min", "stipend_max", "user_id", "reviewer_name",
+                      "upvoters_count", "bookmarkers_count")
+# Long answers, loaded per review by the feed's Details expander
+REVIEW_DETAIL_FIELDS = ("Interview Questions", "Gamified Assessments")
+
+def _field_paths(fields):
+    # Names with spaces have to be backtick-quoted in Firestore field paths
+    return [firestore.FieldPath(field).to_api_repr() for field in fields]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_reviews_where(field, op, value, version):
+    query = db.collection("reviews").where(field, op, value).select(_field_paths(REVIEW_LIST_FIELDS))
+    return [{**doc.to_dict(), "id": doc.id} for doc in query.stream()]
+
+def _feed_query(industry):
+    query = db.collection("reviews")
+    if industry != "All":
+        query = query.where("Industry", "==", industry)
+    # Industry + upvoters_count needs the composite index in firestore.indexes.json
+    return query.order_by("upvoters_count", direction=firestore.Query.DESCENDING).limit(FEED_QUERY_LIMIT)
+
+def _feed_snapshot(docs):
+    reviews = [{"upvoters_count": 0, "bookmarkers_count": 0, **doc.to_dict(), "id": doc.id} for doc in docs]
+    # Columnar copy for filtering and ranking; rows are rendered from the dicts
+    reviews_df = pd.DataFrame(reviews)
+    if reviews:
+        reviews_df = with_stipend_bounds(reviews_df)
+        # astype("string") so a non-string Company value cannot break the .str accessor
+        reviews_df['company_key'] = reviews_df['Company'].astype("string").str.casefold()
+    return reviews, reviews_df
+
+@st.cache_resource
+def _feed_listener_registry():
+    """Live feed listeners and recent listener failures, shared by every session."""
+    return {"feeds": {}, "failed_at": {}, "lock": threading.Lock()}
+
+def _start_feed_listener(industry):
+    """Subscribes to the feed query for an industry filter, pushing each result set into feed."""
+    feed = {"snapshot": None, "error": None, "ready": threading.Event()}
+    def on_snapshot(docs, changes, read_time):
+        # Runs on the listener's thread, so failures are handed back through feed
+        try:
+            feed["snapshot"] = _feed_snapshot(docs)
+        except Exception as e:
+            feed["error"] = e
+        feed["ready"].set()
+    feed["watch"] = _feed_query(industry).on_snapshot(on_snapshot)
+    return feed
+
+def _get_feed_listener(industry):
+    registry = _feed_listener_registry()
+    with registry["lock"]:
+        feed = registry["feeds"].get(industry)
+        if feed is None:
+            feed = registry["feeds"][industry] = _start_feed_listener(industry)
+    return feed
+
+def _stop_feed_listener(industry, feed):
+    registry = _feed_listener_registry()
+    with registry["lock"]:
+        if feed is not None and registry["feeds"].get(industry) is feed:
+            del registry["feeds"][industry]
+        registry["failed_at"][industry] = time.monotonic()
+    if feed is not None:
+        try:
+            feed["watch"].unsubscribe()
+        except Exception:
+            pass
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_feed_reviews(industry, version):
+    query = _feed_query(industry).select(_field_paths(REVIEW_LIST_FIELDS))
+    return _feed_snapshot(query.stream())
+
+def load_feed(industry):
+    """Returns (reviews, reviews_df) for the feed, from the listener when it is healthy."""
+    registry = _feed_listener_registry()
+    with registry["lock"]:
+        failed_at = registry["failed_at"].get(industry)
+    if failed_at is None or time.monotonic() - failed_at > FEED_LISTENER_RETRY:
+        feed = None
+        try:
+            feed = _get_feed_listener(industry)
+            # A stream that closes after its first snapshot never calls back, so
+            # the watch itself has to be checked before serving what it last sent
+            healthy = (feed["ready"].wait(timeout=FEED_LISTENER_TIMEOUT)
+                       and feed["error"] is None and feed["watch"].is_active)
+            if healthy:
+                with registry["lock"]:
+                    registry["failed_at"].pop(industry, None)
+                return feed["snapshot"]
+        except Exception:
+            pass
+        # Drop only this industry's listener so a later rerun re-subscribes, and
+        # skip waiting on it until the retry interval has passed
+        _stop_feed_listener(industry, feed)
+    return _fetch_feed_reviews(industry, st.session_state.reviews_version)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_review(review_id, version):
+    return db.collection("reviews").document(review_id).get().to_dict() or {}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_review_details(review_id):
+    review_ref = db.collection("reviews").document(review_id)
+    return review_ref.get(field_paths=_field_paths(REVIEW_DETAIL_FIELDS)).to_dict() or {}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_apps(user_id, version):
+    apps_ref = db.collection("users").document(user_id).collection("applications")
+    return [{**doc.to_dict(), "_doc_id": doc.id} for doc in apps_ref.stream()]
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_user_doc(user_id, version):
+    return db.collection("users").document(user_id).get().to_dict() or {}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_upvoted_ids(user_id, version):
+    upvotes_ref = db.collection("users").document(user_id).collection("upvoted_reviews")
+    return [doc.id for doc in upvotes_ref.select([firestore.FieldPath.document_id()]).stream()]
+
+def set_applications(records):
+    st.session_state.applications_records = records
+    st.session_state.applications_version += 1
+
+def get_applications_df():
+    """DataFrame view of applications_records, rebuilt only after the records change."""
+    cached = st.session_state.get("applications_df")
+    if cached is None or cached[0] != st.session_state.applications_version:
+        cached = (st.session_state.applications_version, pd.DataFrame(st.session_state.applications_records))
+        st.session_state.applications_df = cached
+    return cached[1]
+
 def load_data():
     try:
-        user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
-        apps_ref = user_ref.collection("applications")
-        apps = [doc.to_dict() for doc in apps_ref.stream()]
-        st.session_state.applications = pd.DataFrame(apps) if apps else pd.DataFrame()
-        user_data = user_ref.get().to_dict() or {}
+        user_id = st.session_state.firebase_user["localId"]
+        version = st.session_state.reviews_version
+        # The reads are independent, so issue them concurrently
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            apps_future = executor.submit(_fetch_apps, user_id, version)
+            user_future = executor.submit(_fetch_user_doc, user_id, version)
+            upvoted_future = executor.submit(_fetch_upvoted_ids, user_id, version)
+            user_reviews_future = executor.submit(_fetch_reviews_where, "user_id", "==", user_id, version)
+            bookmarked_future = executor.submit(_fetch_reviews_where, "bookmarkers", "array_contains", user_id, version)
+        set_applications(apps_future.result())
+        st.session_state.applications_prev = get_applications_df()
+        user_data = user_future.result()
         st.session_state.contributions = pd.DataFrame(user_data.get("contributions", []))
         st.session_state.bookmarks = user_data.get("bookmarks", [])
-        reviews_ref = db.collection("reviews")
-        st.session_state.reviews = [{**doc.to_dict(), "id": doc.id} for doc in reviews_ref.stream()]
+        st.session_state.upvoted_reviews = upvoted_future.result()
+        st.session_state.user_reviews = user_reviews_future.result()
+        st.session_state.bookmarked_reviews = bookmarked_future.result()
     except Exception as e:
         st.error(f"Data load failed: {str(e)}")
 
@@ -207,17 +398,49 @@ if not st.session_state.data_loaded:
     load_data()
     st.session_state.data_loaded = True
 
+def _application_records(apps):
+    """Returns the doc ids and Firestore-ready row dicts of an applications frame."""
+    fields = apps.drop(columns="_doc_id")
+    if "Deadline" in fields.columns:
+        # Normalizes editor dates, naive form datetimes and Firestore UTC timestamps in one pass
+        fields["Deadline"] = pd.to_datetime(fields["Deadline"], errors="coerce", utc=True)
+    fields = fields.astype(object).where(fields.notna(), None)
+    return apps["_doc_id"].tolist(), fields.to_dict("records")
+
 def save_applications():
     try:
         apps_ref = db.collection("users").document(st.session_state.firebase_user["localId"]).collection("applications")
-        for doc in apps_ref.stream():
-            doc.reference.delete()
-        for _, row in st.session_state.applications.iterrows():
-            row_dict = row.to_dict()
-            if "Deadline" in row_dict:
-                if isinstance(row_dict["Deadline"], date) and not isinstance(row_dict["Deadline"], datetime):
-                    row_dict["Deadline"] = datetime.combine(row_dict["Deadline"], datetime.min.time())
-            apps_ref.add(row_dict)
+        apps = get_applications_df()
+        if "_doc_id" not in apps.columns:
+            apps = apps.assign(_doc_id=None)
+        ids, records = _application_records(apps)
+        app_records = st.session_state.applications_records
+        prev = st.session_state.applications_prev
+        prev_rows = dict(zip(*_application_records(prev))) if "_doc_id" in prev.columns else {}
+        ops = []
+        kept_ids = set()
+        for i, (doc_id, row_dict) in enumerate(zip(ids, records)):
+            if pd.isna(doc_id):
+                doc_ref = apps_ref.document()
+                app_records[i]["_doc_id"] = doc_ref.id
+                ops.append(("set", doc_ref, row_dict))
+            else:
+                kept_ids.add(doc_id)
+                if prev_rows.get(doc_id) != row_dict:
+                    ops.append(("set", apps_ref.document(doc_id), row_dict))
+        for doc_id in prev_rows.keys() - kept_ids:
+            ops.append(("delete", apps_ref.document(doc_id), None))
+        for start in range(0, len(ops), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for op, doc_ref, row_dict in ops[start:start + FIRESTORE_BATCH_LIMIT]:
+                if op == "delete":
+                    batch.delete(doc_ref)
+                else:
+                    batch.set(doc_ref, row_dict)
+            batch.commit()
+        set_applications(app_records)
+        st.session_state.applications_prev = get_applications_df()
+        _fetch_apps.clear()
     except Exception as e:
         st.error(f"Failed to save applications: {str(e)}")
 
@@ -225,6 +448,7 @@ def save_contributions():
     try:
         user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
         user_ref.update({"contributions": st.session_state.contributions.to_dict("records")})
+        _fetch_user_doc.clear()
     except Exception as e:
         st.error(f"Failed to save contributions: {str(e)}")
 
@@ -232,46 +456,131 @@ def save_bookmarks():
     try:
         user_ref = db.collection("users").document(st.session_state.firebase_user["localId"])
         user_ref.update({"bookmarks": list(set(st.session_state.bookmarks))})
+        _fetch_user_doc.clear()
     except Exception as e:
         st.error(f"Failed to save bookmarks: {str(e)}")
 
 def save_review(review_data):
     try:
+        review_data['stipend_min'], review_data['stipend_max'] = stipend_bounds(review_data.get('Stipend Range'))
         reviews_ref = db.collection("reviews")
         if st.session_state.edit_review_index is not None:
-            doc_id = st.session_state.reviews[st.session_state.edit_review_index]['id']
+            # Votes are only changed through toggle_review_vote(), so an edit never
+            # writes the voter arrays or counters
+            doc_id = st.session_state.user_reviews[st.session_state.edit_review_index]['id']
             reviews_ref.document(doc_id).update(review_data)
         else:
             review_data['upvoters'] = []
             review_data['bookmarkers'] = []
+            review_data['upvoters_count'] = 0
+            review_data['bookmarkers_count'] = 0
             new_doc = reviews_ref.add(review_data)
             review_data['id'] = new_doc[1].id
+        # Other sessions start at version 0, so drop their cached copies too
+        _fetch_reviews_where.clear()
+        _fetch_feed_reviews.clear()
+        _fetch_review.clear()
+        _fetch_review_details.clear()
+        st.session_state.reviews_version += 1
         load_data()  # Refresh data after save
     except Exception as e:
         st.error(f"Failed to save review: {str(e)}")
 
+@firestore.transactional
+def _apply_vote(transaction, review_ref, user_ref, field, user_id, adding):
+    """Applies a vote change against the review's voter array, returning the counter step applied."""
+    snapshot = review_ref.get(field_paths=[field], transaction=transaction)
+    has_vote = user_id in (snapshot.to_dict() or {}).get(field, [])
+    step = 0 if has_vote == adding else (1 if adding else -1)
+    if step:
+        transaction.update(review_ref, {
+            field: firestore.ArrayUnion([user_id]) if adding else firestore.ArrayRemove([user_id]),
+            f"{field}_count": firestore.Increment(step)
+        })
+    # The user's own record is always brought in line with the requested state
+    if field == "upvoters":
+        upvote_ref = user_ref.collection("upvoted_reviews").document(review_ref.id)
+        if adding:
+            transaction.set(upvote_ref, {"timestamp": firestore.SERVER_TIMESTAMP})
+        else:
+            transaction.delete(upvote_ref)
+    else:
+        bookmark_change = firestore.ArrayUnion([review_ref.id]) if adding else firestore.ArrayRemove([review_ref.id])
+        transaction.set(user_ref, {"bookmarks": bookmark_change}, merge=True)
+    return step
+
+def toggle_review_vote(review, field, user_id):
+    """Adds or removes the user's upvote/bookmark on a review, with its counter and the user's own list."""
+    review_id = review['id']
+    voted = st.session_state.upvoted_reviews if field == "upvoters" else st.session_state.bookmarks
+    adding = review_id not in voted
+    review_ref = db.collection("reviews").document(review_id)
+    user_ref = db.collection("users").document(user_id)
+    try:
+        step = _apply_vote(db.transaction(), review_ref, user_ref, field, user_id, adding)
+    except Exception as e:
+        st.error(f"Failed to update review: {str(e)}")
+        return
+    _fetch_reviews_where.clear()
+    _fetch_feed_reviews.clear()
+    if field == "upvoters":
+        _fetch_upvoted_ids.clear()
+    else:
+        _fetch_user_doc.clear()
+    # Mirror the write into every local copy instead of re-reading the collection
+    if adding:
+        voted.append(review_id)
+    else:
+        while review_id in voted:
+            voted.remove(review_id)
+    profile_reviews = st.session_state.user_reviews + st.session_state.bookmarked_reviews
+    local_copies = [review] + [r for r in profile_reviews if r['id'] == review_id and r is not review]
+    for local in local_copies:
+        local[f"{field}_count"] = local.get(f"{field}_count", 0) + step
+    if field == "bookmarkers":
+        bookmarked = [r for r in st.session_state.bookmarked_reviews if r['id'] != review_id]
+        st.session_state.bookmarked_reviews = bookmarked + [review] if adding else bookmarked
+    st.session_state.reviews_version += 1
+
 # ----------------------
 # Helper Functions
 # ----------------------
 def calculate_kpis():
-    if st.session_state.applications.empty:
+    applications = get_applications_df()
+    if applications.empty:
         return {'Total Applications': 0, 'Rejected': 0, 'In Progress': 0}
-    if 'Status' not in st.session_state.applications.columns:
-        total = len(st.session_state.applications)
+    if 'Status' not in applications.columns:
+        total = len(applications)
         return {'Total Applications': total, 'Rejected': 0, 'In Progress': total}
-    total = len(st.session_state.applications)
-    rejected = len(st.session_state.applications[st.session_state.applications['Status'] == 'Rejected'])
-    in_progress = len(st.session_state.applications[~st.session_state.applications['Status'].isin(['Offer Received', 'Rejected'])])
+    counts = applications['Status'].value_counts(dropna=False)
+    total = int(counts.sum())
+    rejected = int(counts.get('Rejected', 0))
+    in_progress = total - rejected - int(counts.get('Offer Received', 0))
     return {'Total Applications': total, 'Rejected': rejected, 'In Progress': in_progress}
 
 def validate_stipend(stipend):
     if not stipend:
         return True
-    try:
-        parts = stipend.split('-')
-        return len(parts) == 2 and all(part.strip().isdigit() for part in parts)
-    except:
+    if not isinstance(stipend, str):
         return False
+    parts = stipend.split('-')
+    return len(parts) == 2 and all(part.strip().isdigit() for part in parts)
+
+def stipend_bounds(stipend):
+    """Returns the (min, max) of a validated stipend string, (0, 0) when not specified."""
+    if not stipend or stipend == "Not Specified":
+        return 0, 0
+    low, high = stipend.split('-')
+    return int(low.strip()), int(high.strip())
+
+def with_stipend_bounds(reviews_df):
+    """Fills stipend_min/stipend_max for reviews saved before those fields were stored."""
+    stipend = reviews_df.get('Stipend Range', pd.Series(index=reviews_df.index, dtype=object))
+    stipend = stipend.fillna("0-0").replace("Not Specified", "0-0")
+    parsed = stipend.astype("string").str.extract(r"^\s*(\d+)\s*-\s*(\d+)\s*$").astype(float)
+    for column, values in (('stipend_min', parsed[0]), ('stipend_max', parsed[1])):
+        reviews_df[column] = reviews_df[column].fillna(values) if column in reviews_df else values
+    return reviews_df
 
 # ----------------------
 # Sidebar Navigation and Page Storage
@@ -316,29 +625,31 @@ def user_profile():
             notes = st.text_area("Notes")
             if st.form_submit_button("Add Application"):
                 deadline_dt = datetime.combine(deadline, datetime.min.time())
-                new_app = pd.DataFrame([{'Company Name': name,
-                                          'Status': status,
-                                          'Deadline': deadline_dt,
-                                          'Referral Details': referral,
-                                          'Link': link,
-                                          'Notes': notes}])
-                st.session_state.applications = pd.concat([st.session_state.applications, new_app], ignore_index=True)
+                st.session_state.applications_records.append({'Company Name': name,
+                                                              'Status': status,
+                                                              'Deadline': deadline_dt,
+                                                              'Referral Details': referral,
+                                                              'Link': link,
+                                                              'Notes': notes,
+                                                              '_doc_id': None})
+                st.session_state.applications_version += 1
                 save_applications()
                 st.stop()
     
-    edited_df = st.data_editor(st.session_state.applications,
+    applications = get_applications_df()
+    edited_df = st.data_editor(applications,
                                column_config={"Deadline": st.column_config.DateColumn(),
-                                              "Link": st.column_config.LinkColumn()},
+                                              "Link": st.column_config.LinkColumn(),
+                                              "_doc_id": None},
                                num_rows="dynamic")
-    if not edited_df.equals(st.session_state.applications):
-        st.session_state.applications = edited_df
+    if not edited_df.equals(applications):
+        set_applications(edited_df.to_dict("records"))
         save_applications()
     
     
     
     # Display Bookmarked Reviews
-    current_user = st.session_state.firebase_user["localId"]
-    bookmarked_reviews = [review for review in st.session_state.reviews if current_user in review.get("bookmarkers", [])]
+    bookmarked_reviews = st.session_state.bookmarked_reviews
     st.header("Bookmarked Reviews")
     if bookmarked_reviews:
         for review in bookmarked_reviews:
@@ -346,16 +657,15 @@ def user_profile():
             st.caption(f"👨💻 {review['Department']} | 🎓 Semester {review['Semester']}")
             st.write(f"**Process:** {review['Ease of Process']}")
             st.write(f"**Outcome:** {review['Offer Outcome']}")
-            st.write(f"**Upvotes:** {len(review.get('upvoters', []))}  |  **Bookmarks:** {len(review.get('bookmarkers', []))}")
+            st.write(f"**Upvotes:** {review.get('upvoters_count', 0)}  |  **Bookmarks:** {review.get('bookmarkers_count', 0)}")
     else:
         st.write("No bookmarked reviews.")
     
     # Display Your Reviews (submitted reviews) with Edit Option
     st.header("Your Reviews")
-    user_reviews = [(i, review) for i, review in enumerate(st.session_state.reviews)
-                    if review.get("user_id") == st.session_state.firebase_user["localId"]]
+    user_reviews = st.session_state.user_reviews
     if user_reviews:
-        for i, review in user_reviews:
+        for i, review in enumerate(user_reviews):
             col1, col2 = st.columns([8,2])
             reviewer_display = review.get("reviewer_name", "Anonymous")
             col1.markdown(f"**{review['Company']} ({review['Industry']})** - {review['Offer Outcome']}")
@@ -371,6 +681,20 @@ def user_profile():
 # ----------------------
 # Internship Feed Page
 # ----------------------
+COMPANY_OPTIONS = ['Google', 'Microsoft', 'Goldman Sachs', 'Other']
+INDUSTRY_OPTIONS = ["Tech", "Finance", "Marketing", "HR", "Other"]
+EASE_PROCESS_OPTIONS = ["Easy", "Moderate", "Hard"]
+REFERRAL_OPTIONS = ["Yes", "No"]
+DEPARTMENT_OPTIONS = ["Tech", "Finance", "HR", "Marketing", "Operations"]
+OUTCOME_OPTIONS = ["Accepted", "Rejected", "In Process"]
+# Option -> selectbox index, for pre-filling the review form when editing
+COMPANY_IDX = {c: i for i, c in enumerate(COMPANY_OPTIONS)}
+INDUSTRY_IDX = {c: i for i, c in enumerate(INDUSTRY_OPTIONS)}
+EASE_PROCESS_IDX = {c: i for i, c in enumerate(EASE_PROCESS_OPTIONS)}
+REFERRAL_IDX = {c: i for i, c in enumerate(REFERRAL_OPTIONS)}
+DEPARTMENT_IDX = {c: i for i, c in enumerate(DEPARTMENT_OPTIONS)}
+OUTCOME_IDX = {c: i for i, c in enumerate(OUTCOME_OPTIONS)}
+
 def internship_feed():
     st.header("🎯 Internship Feed")
     col1, col2, col3, col4 = st.columns([2,2,2,1])
@@ -384,7 +708,8 @@ def internship_feed():
     
     review_to_edit = None
     if st.session_state.edit_review_index is not None:
-        review_to_edit = st.session_state.reviews[st.session_state.edit_review_index]
+        review_id = st.session_state.user_reviews[st.session_state.edit_review_index]['id']
+        review_to_edit = _fetch_review(review_id, st.session_state.reviews_version)
     
     if st.session_state.show_form:
         with st.form("review_form", clear_on_submit=True):
@@ -394,33 +719,25 @@ def internship_feed():
                                      index=0)
             col1, col2 = st.columns(2)
             with col1:
-                company_options = ['Google', 'Microsoft', 'Goldman Sachs', 'Other']
                 default_company = review_to_edit['Company'] if review_to_edit else 'Google'
-                if default_company in company_options:
-                    company = st.selectbox("Company", company_options, index=company_options.index(default_company))
-                else:
-                    company = st.selectbox("Company", company_options, index=company_options.index('Other'))
+                company = st.selectbox("Company", COMPANY_OPTIONS, index=COMPANY_IDX.get(default_company, COMPANY_IDX['Other']))
                 custom_company = st.text_input("Custom Company", value=review_to_edit.get("Custom Company", "") if review_to_edit and company=='Other' else "")
-                industry_options = ["Tech", "Finance", "Marketing", "HR", "Other"]
                 default_industry = review_to_edit['Industry'] if review_to_edit else "Tech"
-                industry = st.selectbox("Industry", industry_options, index=industry_options.index(default_industry))
-                ease_process_options = ["Easy", "Moderate", "Hard"]
+                industry = st.selectbox("Industry", INDUSTRY_OPTIONS, index=INDUSTRY_IDX.get(default_industry, 0))
                 default_ease = review_to_edit['Ease of Process'] if review_to_edit else "Easy"
-                ease_process = st.selectbox("Ease of Process", ease_process_options, index=ease_process_options.index(default_ease))
+                ease_process = st.selectbox("Ease of Process", EASE_PROCESS_OPTIONS, index=EASE_PROCESS_IDX.get(default_ease, 0))
                 assessments = st.text_area("Gamified Assessments", value=review_to_edit.get("Gamified Assessments", "") if review_to_edit else "")
                 interview_questions = st.text_area("Interview Questions", value=review_to_edit.get("Interview Questions", "") if review_to_edit else "")
                 stipend = st.text_input("Stipend Range (₹) (Optional)", value=review_to_edit.get("Stipend Range", "") if review_to_edit else "")
             with col2:
                 hiring_rating = st.slider("Hiring Ease (1-5)", 1, 5, value=review_to_edit.get("Ease of Hiring", 3) if review_to_edit else 3)
-                referral = st.radio("Referral Used?", ["Yes", "No"], index=["Yes", "No"].index(review_to_edit.get("Referral Used", "Yes")) if review_to_edit else 0)
+                referral = st.radio("Referral Used?", REFERRAL_OPTIONS, index=REFERRAL_IDX.get(review_to_edit.get("Referral Used", "Yes"), 0) if review_to_edit else 0)
                 red_flags = st.slider("Red Flags (1-5)", 1, 5, value=review_to_edit.get("Red Flags", 3) if review_to_edit else 3)
-                department_options = ["Tech", "Finance", "HR", "Marketing", "Operations"]
                 default_dept = review_to_edit['Department'] if review_to_edit else "Tech"
-                department = st.selectbox("Department", department_options, index=department_options.index(default_dept))
+                department = st.selectbox("Department", DEPARTMENT_OPTIONS, index=DEPARTMENT_IDX.get(default_dept, 0))
                 semester = st.slider("Semester", 1, 8, value=review_to_edit.get("Semester", 5) if review_to_edit else 5)
-                outcome_options = ["Accepted", "Rejected", "In Process"]
                 default_outcome = review_to_edit['Offer Outcome'] if review_to_edit else "Accepted"
-                outcome = st.selectbox("Outcome", outcome_options, index=outcome_options.index(default_outcome))
+                outcome = st.selectbox("Outcome", OUTCOME_OPTIONS, index=OUTCOME_IDX.get(default_outcome, 0))
             if st.form_submit_button("Submit Review"):
                 errors = []
                 if company == 'Other' and not custom_company:
@@ -447,8 +764,6 @@ def internship_feed():
                         'Semester': semester,
                         'Offer Outcome': outcome,
                         'reviewer_name': reviewer_name,
-                        'upvoters': review_to_edit.get("upvoters", []) if review_to_edit else [],
-                        'bookmarkers': review_to_edit.get("bookmarkers", []) if review_to_edit else [],
                         'timestamp': firestore.SERVER_TIMESTAMP
                     }
                     save_review(new_review)
@@ -462,27 +777,24 @@ def internship_feed():
                     st.session_state.dummy = not st.session_state.get("dummy", False)
                     #st.stop()
     
-    filtered_reviews = []
-    for review in st.session_state.reviews:
-        try:
-            stipend_val = review.get('Stipend Range', '0-0')
-            min_stipend = max_stipend = 0
-            if stipend_val != "Not Specified":
-                parts = stipend_val.split('-')
-                min_stipend, max_stipend = int(parts[0].strip()), int(parts[1].strip())
-            matches = (
-                (company_search.lower() in review['Company'].lower()) and
-                (industry_filter == "All" or review['Industry'] == industry_filter) and
-                (min_stipend >= stipend_range[0]) and 
-                (max_stipend <= stipend_range[1])
-            )
-            if matches:
-                filtered_reviews.append(review)
-        except:
-            continue
+    try:
+        feed_reviews, reviews_df = load_feed(industry_filter)
+    except Exception as e:
+        st.error(f"Failed to load reviews: {str(e)}")
+        feed_reviews, reviews_df = [], pd.DataFrame()
+    top_reviews = []
+    if feed_reviews:
+        needle = company_search.casefold()
+        matches = (
+            reviews_df['company_key'].str.contains(needle, regex=False, na=False) &
+            (reviews_df['stipend_min'] >= stipend_range[0]) &
+            (reviews_df['stipend_max'] <= stipend_range[1])
+        )
+        # Copies, since the listener's dicts are shared by every session
+        top_reviews = [dict(feed_reviews[i]) for i in reviews_df[matches].nlargest(5, 'upvoters_count').index]
     
     st.subheader("Top Reviews")
-    for idx, review in enumerate(sorted(filtered_reviews, key=lambda x: len(x.get("upvoters", [])), reverse=True)[:5]):
+    for idx, review in enumerate(top_reviews):
         with st.container(border=True):
             col1, col2 = st.columns([4,1])
             with col1:
@@ -493,33 +805,21 @@ def internship_feed():
                 st.write(f"**Rating:** {'⭐' * review['Ease of Hiring']}")
                 st.write(f"**Red Flags:** {'🚩' * review['Red Flags']}")
                 with st.expander("Details"):
-                    st.write(f"**Assessments:** {review['Gamified Assessments']}")
-                    st.write(f"**Questions:** {review['Interview Questions']}")
+                    # Fallback rows are projected; expander bodies run even when
+                    # collapsed, so only the two answers are read, and votes do
+                    # not invalidate them
+                    details = review if 'Interview Questions' in review else _fetch_review_details(review['id'])
+                    st.write(f"**Assessments:** {details.get('Gamified Assessments', '')}")
+                    st.write(f"**Questions:** {details.get('Interview Questions', '')}")
             with col2:
                 st.write(f"**Outcome:** {review['Offer Outcome']}")
                 user_id = st.session_state.firebase_user["localId"]
-                upvoters = review.get("upvoters", [])
-                bookmarkers = review.get("bookmarkers", [])
-                if user_id in upvoters:
-                    if st.button(f"Remove Upvote (👍 {len(upvoters)})", key=f"upvote_{idx}"):
-                        review_ref = db.collection("reviews").document(review['id'])
-                        review_ref.update({"upvoters": firestore.ArrayRemove([user_id])})
-                        load_data()
-                else:
-                    if st.button(f"Upvote (👍 {len(upvoters)})", key=f"upvote_{idx}"):
-                        review_ref = db.collection("reviews").document(review['id'])
-                        review_ref.update({"upvoters": firestore.ArrayUnion([user_id])})
-                        load_data()
-                if user_id in bookmarkers:
-                    if st.button(f"Remove Bookmark (🔖 {len(bookmarkers)})", key=f"bookmark_{idx}"):
-                        review_ref = db.collection("reviews").document(review['id'])
-                        review_ref.update({"bookmarkers": firestore.ArrayRemove([user_id])})
-                        load_data()
-                else:
-                    if st.button(f"Bookmark (🔖 {len(bookmarkers)})", key=f"bookmark_{idx}"):
-                        review_ref = db.collection("reviews").document(review['id'])
-                        review_ref.update({"bookmarkers": firestore.ArrayUnion([user_id])})
-                        load_data()
+                upvote_label = "Remove Upvote" if review['id'] in st.session_state.upvoted_reviews else "Upvote"
+                if st.button(f"{upvote_label} (👍 {review['upvoters_count']})", key=f"upvote_{idx}"):
+                    toggle_review_vote(review, "upvoters", user_id)
+                bookmark_label = "Remove Bookmark" if review['id'] in st.session_state.bookmarks else "Bookmark"
+                if st.button(f"{bookmark_label} (🔖 {review['bookmarkers_count']})", key=f"bookmark_{idx}"):
+                    toggle_review_vote(review, "bookmarkers", user_id)
 
 if st.session_state.page == "👤 User Profile":
     user_profile()
@@ -531,15 +831,3 @@ if st.session_state.firebase_user:
         st.session_state.clear()
         st.query_params = {}
         st.stop()
-
-st.markdown("""
-<style>
-    [data-testid="stMetricValue"] { font-size: 18px; }
-    [data-testid="stMetricLabel"] { font-size: 16px; }
-    .stDataFrame { margin-bottom: 20px; }
-    [data-testid="stExpander"] div[role="button"] p { font-size: 1.2rem; font-weight: bold; }
-    .stButton>button { width: 100%; margin: 5px 0; transition: all 0.3s ease; }
-    .stButton>button:hover { transform: scale(1.05); box-shadow: 0 2px 5px rgba(0,0,0,0.2); }
-    .stContainer { border-radius: 10px; padding: 20px; margin: 10px 0; box-shadow: 0 2px 5px rgba(0,0,0,0.1); background: #f8f9fa; }
-</style>
-""", unsafe_allow_html=True)
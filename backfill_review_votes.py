@@ -0,0 +1,39 @@
+"""Backfills vote counters and per-user vote records for reviews saved before they existed."""
+# Run once from the app directory before deploying: python backfill_review_votes.py
+# Reads the service account from .streamlit/secrets.toml like app.py; re-running is harmless.
+import streamlit as st
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+VOTE_FIELDS = ("upvoters", "bookmarkers")
+
+@firestore.transactional
+def _backfill_review(transaction, db, review_ref):
+    """Sets a review's counters from its voter arrays and mirrors each vote into the voter's records."""
+    fields = [*VOTE_FIELDS, *(f"{field}_count" for field in VOTE_FIELDS)]
+    review = review_ref.get(field_paths=fields, transaction=transaction).to_dict() or {}
+    counts = {f"{field}_count": len(review.get(field, [])) for field in VOTE_FIELDS
+              if review.get(f"{field}_count") != len(review.get(field, []))}
+    if counts:
+        transaction.update(review_ref, counts)
+    for uid in review.get("upvoters", []):
+        upvote_ref = db.collection("users").document(uid).collection("upvoted_reviews").document(review_ref.id)
+        transaction.set(upvote_ref, {"timestamp": firestore.SERVER_TIMESTAMP}, merge=True)
+    for uid in review.get("bookmarkers", []):
+        transaction.set(db.collection("users").document(uid), {"bookmarks": firestore.ArrayUnion([review_ref.id])}, merge=True)
+    return bool(counts)
+
+def main():
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(dict(st.secrets["firebase"])))
+    db = firestore.client()
+    scanned = fixed = 0
+    # Only ids are scanned; each review is re-read inside its own transaction, so
+    # a vote landing mid-run cannot be overwritten with a stale count
+    for doc in db.collection("reviews").select([firestore.FieldPath.document_id()]).stream():
+        scanned += 1
+        fixed += _backfill_review(db.transaction(), db, doc.reference)
+    print(f"Backfilled {scanned} reviews, {fixed} counter fixes")
+
+if __name__ == "__main__":
+    main()